@@ -0,0 +1,42 @@
+import argparse
+import asyncio
+import json
+from api.config import settings
+from api.dependencies import SessionLocal, engine, redis_client, close_clients
+from api.models import Base
+from api.services.archive_service import archive_soft_deleted
+from api.services.redis_service import bump_search_generation
+from api.services.side_effects import run_side_effects
+from api.services.version_service import bump_version, ROLES_SCOPE
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Move long soft-deleted users and roles into the archive tables.")
+    parser.add_argument("--retention-days", type=int, default=settings.ARCHIVE_RETENTION_DAYS,
+                        help="Archive rows soft-deleted more than this many days ago")
+    parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE,
+                        help="Rows moved per transaction")
+    args = parser.parse_args(argv)
+
+    # The shared async Redis client is bound to the loop it first runs on, so keep one for the whole job
+    loop = asyncio.new_event_loop()
+
+    def invalidate_roles(role_ids: list[int], links_moved: int):
+        # Users lost these roles: move the role ETags (which user ETags include) and the search cache on
+        if links_moved:
+            loop.run_until_complete(run_side_effects(
+                version=bump_version(redis_client, ROLES_SCOPE, *role_ids),
+                search=bump_search_generation(redis_client),
+            ))
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        report = archive_soft_deleted(db, args.retention_days, args.batch_size, on_role_batch=invalidate_roles)
+    finally:
+        db.close()
+        loop.run_until_complete(close_clients())
+        loop.close()
+    print(json.dumps(report))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import argparse
+import gzip
+import sys
+from datetime import date
+from api.services.export_service import export_users_to, EXPORT_FORMATS, CSV
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Export users with their role names as CSV or NDJSON.")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default=CSV)
+    parser.add_argument("--updated-since", type=date.fromisoformat, default=None,
+                        help="Only users created or updated on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--include-deleted", action="store_true", help="Include soft-deleted users")
+    parser.add_argument("--gzip", action="store_true", help="Gzip the output")
+    parser.add_argument("--output", "-o", default="-", help="Output file, '-' for stdout")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        if args.gzip:
+            with gzip.GzipFile(fileobj=out, mode="wb") as compressed:
+                export_users_to(compressed, args.format, args.updated_since, args.include_deleted)
+        else:
+            export_users_to(out, args.format, args.updated_since, args.include_deleted)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+if __name__ == "__main__":
+    main()
@@ -14,13 +14,43 @@ class Settings:
     DATABASE_URL = (
         f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
     )
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
     
     REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+    REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+    REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", 2))
     
     ELASTICSEARCH_HOST = os.getenv("ELASTICSEARCH_HOST", "localhost")
     ELASTICSEARCH_PORT = int(os.getenv("ELASTICSEARCH_PORT", 9200))
     ELASTICSEARCH_URL = f"http://{ELASTICSEARCH_HOST}:{ELASTICSEARCH_PORT}"
+    ELASTICSEARCH_MAX_CONNECTIONS = int(os.getenv("ELASTICSEARCH_MAX_CONNECTIONS", 10))
+    ELASTICSEARCH_TIMEOUT = float(os.getenv("ELASTICSEARCH_TIMEOUT", 5))
+
+    # Upper bound for each post-write side effect (indexing, cache invalidation)
+    SIDE_EFFECT_TIMEOUT = float(os.getenv("SIDE_EFFECT_TIMEOUT", 2))
+
+    BATCH_GET_MAX_IDS = int(os.getenv("BATCH_GET_MAX_IDS", 500))
+    SUGGEST_MAX_RESULTS = int(os.getenv("SUGGEST_MAX_RESULTS", 10))
+    SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 30))
+
+    # Admission control: concurrent requests per route class, plus a bounded wait queue.
+    # Keep the sum of the limits at or below DB_POOL_SIZE + DB_MAX_OVERFLOW.
+    ADMISSION_EXPENSIVE_LIMIT = int(os.getenv("ADMISSION_EXPENSIVE_LIMIT", 4))
+    ADMISSION_DEFAULT_LIMIT = int(os.getenv("ADMISSION_DEFAULT_LIMIT", 11))
+    ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", 50))
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 5))
+    ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", 1))
+
+    # Optional per-client token bucket kept in Redis
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "false").lower() == "true"
+    RATE_LIMIT_RATE = float(os.getenv("RATE_LIMIT_RATE", 20))
+    RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", 40))
+
+    ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", 30))
+    ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 500))
 
     def __init__(self):  # Changed from __post_init__ to __init__
         logger.info(f"Environment variables: POSTGRES_HOST={self.POSTGRES_HOST}, POSTGRES_PORT={self.POSTGRES_PORT}, "
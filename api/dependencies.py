@@ -1,15 +1,22 @@
+from fastapi import Depends, HTTPException, Request
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
-from redis import Redis
-from elasticsearch import Elasticsearch
-from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type
+from redis.asyncio import Redis
+from elasticsearch import AsyncElasticsearch
 from api.config import settings
+from api.services.version_service import version_key, get_versions, make_etag, etag_matches
 import logging
 
 logger = logging.getLogger(__name__)
 
 # Database dependency
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+engine = create_engine(
+    settings.DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -25,22 +32,58 @@ def get_db():
     finally:
         db.close()
 
+# Shared clients; both keep their own connection pool and connect lazily on first use
+redis_client = Redis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    decode_responses=True,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    socket_timeout=settings.REDIS_TIMEOUT,
+)
+es_client = AsyncElasticsearch(
+    [settings.ELASTICSEARCH_URL],
+    connections_per_node=settings.ELASTICSEARCH_MAX_CONNECTIONS,
+    request_timeout=settings.ELASTICSEARCH_TIMEOUT,
+)
+
+async def close_clients():
+    await redis_client.aclose()
+    await es_client.close()
+    logger.info("Redis and Elasticsearch clients closed")
+
 # Redis dependency
-@retry(stop=stop_after_attempt(5), wait=wait_fixed(2), retry=retry_if_exception_type(ConnectionError))
-def get_redis():
-    redis_client = Redis(
-        host=settings.REDIS_HOST,
-        port=settings.REDIS_PORT,
-        decode_responses=True,
-    )
-    redis_client.ping()
-    logger.info("Redis connection successful")
+async def get_redis() -> Redis:
     return redis_client
 
 # Elasticsearch dependency
-@retry(stop=stop_after_attempt(5), wait=wait_fixed(2), retry=retry_if_exception_type(ConnectionError))
-def get_elasticsearch():
-    es_client = Elasticsearch([settings.ELASTICSEARCH_URL])
-    es_client.ping()
-    logger.info("Elasticsearch connection successful")
+async def get_elasticsearch() -> AsyncElasticsearch:
     return es_client
+
+# Conditional GET dependency
+def conditional_get(scope: str, *related_scopes: str, id_param: str | None = None):
+    """
+    Build a dependency that computes the current ETag for `scope` (or for one entity of it,
+    when `id_param` names a path parameter) with a single Redis MGET, and short-circuits
+    with 304 when it matches If-None-Match. Declare it before `get_db` in the endpoint
+    signature so a 304 never opens a database session.
+    """
+    async def dependency(request: Request, redis: Redis = Depends(get_redis)) -> str | None:
+        if id_param is None:
+            keys = [version_key(scope)]
+        else:
+            try:
+                entity_id = int(request.path_params[id_param])
+            except ValueError:
+                # Leave the 422 to FastAPI's own path validation
+                return None
+            keys = [version_key(scope, entity_id)]
+        keys += [version_key(related) for related in related_scopes]
+        versions = await get_versions(redis, keys)
+        if versions is None:
+            return None
+        etag = make_etag(versions)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            logger.info(f"ETag {etag} matched for {request.url.path}, returning 304")
+            raise HTTPException(status_code=304, headers={"ETag": etag})
+        return etag
+    return dependency
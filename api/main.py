@@ -1,15 +1,45 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from api.routers.user import router as user_router
 from api.routers.role import router as role_router
-from api.dependencies import engine
+from api.routers.stats import router as stats_router
+from api.dependencies import engine, SessionLocal, close_clients, redis_client, es_client
+from api.middleware.admission import AdmissionControlMiddleware, RateLimiter, gates, render_metrics
+from api.config import settings
 from api.models import Base
+from api.services.stats_service import ensure_stats
+from api.services.elasticsearch_service import ensure_users_index
+import logging
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
+rate_limiter = RateLimiter(redis_client, settings.RATE_LIMIT_RATE, settings.RATE_LIMIT_BURST) if settings.RATE_LIMIT_ENABLED else None
+app.add_middleware(AdmissionControlMiddleware, gates=gates, rate_limiter=rate_limiter)
+
 # Create tables on startup
 @app.on_event("startup")
 async def startup_event():
     Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        ensure_stats(db)
+    finally:
+        db.close()
+    try:
+        await ensure_users_index(es_client)
+    except Exception as e:
+        logger.error(f"Failed to prepare Elasticsearch index 'users': {str(e)}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_clients()
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return render_metrics(gates)
 
 app.include_router(user_router)
 app.include_router(role_router)
+app.include_router(stats_router)
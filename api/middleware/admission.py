@@ -0,0 +1,198 @@
+import asyncio
+import json
+import math
+import re
+import time
+from redis.asyncio import Redis
+from api.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXPENSIVE = "expensive"
+DEFAULT = "default"
+
+# Routes that scan or aggregate many rows; everything else under the API prefixes is "default"
+EXPENSIVE_ROUTES = [
+    ("GET", re.compile(r"^/users/?$")),
+    ("GET", re.compile(r"^/users/search$")),
+    ("GET", re.compile(r"^/users/export$")),
+    ("GET", re.compile(r"^/users/soft-deleted$")),
+    ("GET", re.compile(r"^/roles/soft-deleted$")),
+]
+GATED_PREFIXES = ("/users", "/roles", "/stats")
+# Routes that never touch Postgres, so they must not queue behind the gates sized to its pool
+UNGATED_ROUTES = [
+    ("GET", re.compile(r"^/users/suggest$")),
+]
+
+def classify_route(method: str, path: str) -> str | None:
+    """Return the route class a request is admitted under, or None if it is not gated."""
+    if not path.startswith(GATED_PREFIXES):
+        return None
+    for route_method, pattern in UNGATED_ROUTES:
+        if method == route_method and pattern.match(path):
+            return None
+    for route_method, pattern in EXPENSIVE_ROUTES:
+        if method == route_method and pattern.match(path):
+            return EXPENSIVE
+    return DEFAULT
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionGate:
+    """
+    Concurrency limit for one route class with a bounded FIFO wait queue.
+    Requests beyond `limit` wait up to `queue_timeout` seconds; when `queue_size`
+    requests are already waiting, new ones are rejected immediately.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.queue_seconds_sum = 0.0
+        self.admitted_total = 0
+        self.rejected_total = {"queue_full": 0, "queue_timeout": 0, "rate_limited": 0}
+
+    async def acquire(self):
+        started = time.perf_counter()
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+        elif self.waiting >= self.queue_size:
+            self.rejected_total["queue_full"] += 1
+            raise Rejected(503, "queue_full", settings.ADMISSION_RETRY_AFTER)
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected_total["queue_timeout"] += 1
+                raise Rejected(503, "queue_timeout", settings.ADMISSION_RETRY_AFTER)
+            finally:
+                self.waiting -= 1
+        self.in_flight += 1
+        self.queue_seconds_sum += time.perf_counter() - started
+        self.admitted_total += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+# Token bucket refilled at `rate` tokens/s up to `burst`; uses the Redis clock so all workers agree
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+class RateLimiter:
+    def __init__(self, redis_client: Redis, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def check(self, client_id: str):
+        """Take one token for `client_id`; raise Rejected(429) when the bucket is empty. Fails open."""
+        try:
+            wait = float(await self._script(keys=[f"ratelimit:{client_id}"], args=[self.rate, self.burst]))
+        except Exception as e:
+            logger.warning(f"Rate limit check failed for {client_id}, allowing request: {str(e)}")
+            return
+        if wait > 0:
+            raise Rejected(429, "rate_limited", max(1, math.ceil(wait)))
+
+class AdmissionControlMiddleware:
+    """ASGI middleware that applies the per-client rate limit and the per-route-class gates."""
+
+    def __init__(self, app, gates: dict[str, AdmissionGate], rate_limiter: RateLimiter | None = None):
+        self.app = app
+        self.gates = gates
+        self.rate_limiter = rate_limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route_class = classify_route(scope["method"], scope["path"])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        gate = self.gates[route_class]
+        try:
+            if self.rate_limiter is not None:
+                client = scope.get("client")
+                try:
+                    await self.rate_limiter.check(client[0] if client else "unknown")
+                except Rejected:
+                    gate.rejected_total["rate_limited"] += 1
+                    raise
+            await gate.acquire()
+        except Rejected as rejection:
+            logger.warning(f"Rejected {scope['method']} {scope['path']} ({route_class}): {rejection.reason}")
+            await _send_rejection(send, rejection)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+async def _send_rejection(send, rejection: Rejected):
+    body = json.dumps({"detail": rejection.reason}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": rejection.status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(rejection.retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+def render_metrics(gates: dict[str, AdmissionGate]) -> str:
+    """Admission metrics for this worker in the Prometheus text exposition format."""
+    lines = [
+        "# TYPE admission_in_flight gauge",
+        "# TYPE admission_waiting gauge",
+        "# TYPE admission_queue_seconds summary",
+        "# TYPE admission_rejected_total counter",
+    ]
+    for name, gate in gates.items():
+        lines.append(f'admission_in_flight{{route_class="{name}"}} {gate.in_flight}')
+        lines.append(f'admission_waiting{{route_class="{name}"}} {gate.waiting}')
+        lines.append(f'admission_queue_seconds_sum{{route_class="{name}"}} {gate.queue_seconds_sum:.6f}')
+        lines.append(f'admission_queue_seconds_count{{route_class="{name}"}} {gate.admitted_total}')
+        for reason, count in gate.rejected_total.items():
+            lines.append(f'admission_rejected_total{{route_class="{name}",reason="{reason}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+gates = {
+    EXPENSIVE: AdmissionGate(EXPENSIVE, settings.ADMISSION_EXPENSIVE_LIMIT, settings.ADMISSION_QUEUE_SIZE, settings.ADMISSION_QUEUE_TIMEOUT),
+    DEFAULT: AdmissionGate(DEFAULT, settings.ADMISSION_DEFAULT_LIMIT, settings.ADMISSION_QUEUE_SIZE, settings.ADMISSION_QUEUE_TIMEOUT),
+}
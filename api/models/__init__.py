@@ -2,3 +2,9 @@ from .base import Base
 from .user import User
 from .role import Role
 from .user_role import UserRole
+from .user_archive import UserArchive
+from .role_archive import RoleArchive
+from .user_role_archive import UserRoleArchive
+from .user_stat import UserStat
+from .user_signup_stat import UserSignupStat
+from .role_user_stat import RoleUserStat
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Boolean, Date
+from sqlalchemy.sql import func
+from .base import Base
+
+class RoleArchive(Base):
+    __tablename__ = "role_archive"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), nullable=False)
+    is_default = Column(Boolean, default=False)
+    can_deleted = Column(Boolean, default=True)
+    created_at = Column(Date)
+    updated_at = Column(Date)
+    deleted_at = Column(Date)
+    archived_at = Column(Date, server_default=func.current_date())
+
+    def __repr__(self):
+        return f"<RoleArchive(name={self.name})>"
@@ -0,0 +1,7 @@
+from sqlalchemy import Column, Integer
+from .base import Base
+
+class RoleUserStat(Base):
+    __tablename__ = "role_user_stat"
+    role_id = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, Boolean, Date
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from .base import Base
+
+class UserArchive(Base):
+    __tablename__ = "user_archive"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), nullable=False)
+    email = Column(String(255), nullable=False)
+    is_default = Column(Boolean, default=False)
+    can_deleted = Column(Boolean, default=True)
+    created_at = Column(Date)
+    updated_at = Column(Date)
+    deleted_at = Column(Date)
+    archived_at = Column(Date, server_default=func.current_date())
+    # Archived links have no foreign keys, so only roles that are still live are resolved
+    roles = relationship(
+        "Role",
+        secondary="user_role_archive",
+        primaryjoin="UserArchive.id == foreign(UserRoleArchive.user_id)",
+        secondaryjoin="Role.id == foreign(UserRoleArchive.role_id)",
+        viewonly=True,
+    )
+
+    def __repr__(self):
+        return f"<UserArchive(name={self.name}, email={self.email})>"
@@ -0,0 +1,7 @@
+from sqlalchemy import Column, Integer
+from .base import Base
+
+class UserRoleArchive(Base):
+    __tablename__ = "user_role_archive"
+    user_id = Column(Integer, primary_key=True)
+    role_id = Column(Integer, primary_key=True, index=True)
@@ -0,0 +1,7 @@
+from sqlalchemy import Column, Integer, Date
+from .base import Base
+
+class UserSignupStat(Base):
+    __tablename__ = "user_signup_stat"
+    day = Column(Date, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,7 @@
+from sqlalchemy import Column, Integer, String
+from .base import Base
+
+class UserStat(Base):
+    __tablename__ = "user_stat"
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
@@ -1,56 +1,87 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from api.dependencies import get_db
+from redis.asyncio import Redis
+from api.dependencies import get_db, get_redis, conditional_get
 from api.schemas.role import RoleCreate, RoleUpdate, RoleResponse
 from api.services.role_service import store_role, get_all_roles, get_role_by_id, update_role, soft_deleted_role, restore_role, hard_soft_deleted_role, get_all_soft_deleted_roles
+from api.services.version_service import bump_version, ROLES_SCOPE
+from api.services.redis_service import bump_search_generation
+from api.services.side_effects import run_side_effects
+from api.services.archive_service import RestoreConflict
 from typing import List
 
 router = APIRouter(prefix="/roles", tags=["roles"])
 
 @router.post("", response_model=RoleResponse, summary="Store a new role")
-async def store_role_endpoint(role: RoleCreate, db: Session = Depends(get_db)):
+async def store_role_endpoint(role: RoleCreate, db: Session = Depends(get_db), redis: Redis = Depends(get_redis)):
     try:
-        return store_role(db, role)
+        db_role = store_role(db, role)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    await bump_version(redis, ROLES_SCOPE, db_role.id)
+    return db_role
 
 @router.get("", response_model=List[RoleResponse], summary="Get all roles")
-async def get_all_roles_endpoint(db: Session = Depends(get_db)):
+async def get_all_roles_endpoint(response: Response, etag: str | None = Depends(conditional_get(ROLES_SCOPE)), db: Session = Depends(get_db)):
+    if etag:
+        response.headers["ETag"] = etag
     return get_all_roles(db)
 
 @router.get("/{role_id}", response_model=RoleResponse, summary="Get role by ID")
-async def get_role_by_id_endpoint(role_id: int, db: Session = Depends(get_db)):
+async def get_role_by_id_endpoint(role_id: int, response: Response, etag: str | None = Depends(conditional_get(ROLES_SCOPE, id_param="role_id")), db: Session = Depends(get_db)):
     role = get_role_by_id(db, role_id)
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
+    if etag:
+        response.headers["ETag"] = etag
     return role
 
+# Role writes also start a new search generation, since full search results embed roles
 @router.put("/{role_id}", response_model=RoleResponse, summary="Update a role")
-async def update_role_endpoint(role_id: int, role: RoleUpdate, db: Session = Depends(get_db)):
+async def update_role_endpoint(role_id: int, role: RoleUpdate, db: Session = Depends(get_db), redis: Redis = Depends(get_redis)):
     db_role = update_role(db, role_id, role)
     if not db_role:
         raise HTTPException(status_code=404, detail="Role not found")
+    await run_side_effects(
+        version=bump_version(redis, ROLES_SCOPE, role_id),
+        search=bump_search_generation(redis),
+    )
     return db_role
 
 @router.post("/soft-delete/{role_id}", response_model=dict, summary="Soft delete a role")
-async def soft_deleted_role_endpoint(role_id: int, db: Session = Depends(get_db)):
+async def soft_deleted_role_endpoint(role_id: int, db: Session = Depends(get_db), redis: Redis = Depends(get_redis)):
     success = soft_deleted_role(db, role_id)
     if not success:
         raise HTTPException(status_code=404, detail="Role not found or cannot be deleted")
+    await run_side_effects(
+        version=bump_version(redis, ROLES_SCOPE, role_id),
+        search=bump_search_generation(redis),
+    )
     return {"message": f"Role {role_id} soft deleted"}
 
 @router.post("/restore/{role_id}", response_model=dict, summary="Restore a role")
-async def restore_role_endpoint(role_id: int, db: Session = Depends(get_db)):
-    success = restore_role(db, role_id)
+async def restore_role_endpoint(role_id: int, db: Session = Depends(get_db), redis: Redis = Depends(get_redis)):
+    try:
+        success = restore_role(db, role_id)
+    except RestoreConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
     if not success:
         raise HTTPException(status_code=404, detail="Role not found or not soft deleted")
+    await run_side_effects(
+        version=bump_version(redis, ROLES_SCOPE, role_id),
+        search=bump_search_generation(redis),
+    )
     return {"message": f"Role {role_id} restored"}
 
 @router.delete("/{role_id}", response_model=dict, summary="Hard delete a role")
-async def hard_soft_deleted_role_endpoint(role_id: int, db: Session = Depends(get_db)):
+async def hard_soft_deleted_role_endpoint(role_id: int, db: Session = Depends(get_db), redis: Redis = Depends(get_redis)):
     success = hard_soft_deleted_role(db, role_id)
     if not success:
         raise HTTPException(status_code=404, detail="Role not found or cannot be deleted")
+    await run_side_effects(
+        version=bump_version(redis, ROLES_SCOPE, role_id),
+        search=bump_search_generation(redis),
+    )
     return {"message": f"Role {role_id} hard deleted"}
 
 @router.get("/soft-deleted", response_model=List[RoleResponse], summary="Get all soft deleted roles")
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from datetime import date
+from api.dependencies import get_db
+from api.schemas.stats import UserTotals, RoleUserCount, SignupCount
+from api.services.stats_service import get_user_totals, get_users_per_role, get_signups_per_day
+from typing import List, Optional
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+@router.get("/users", response_model=UserTotals, summary="Active and soft-deleted user counts")
+async def get_user_totals_endpoint(db: Session = Depends(get_db)):
+    return get_user_totals(db)
+
+@router.get("/roles", response_model=List[RoleUserCount], summary="Active users per role")
+async def get_users_per_role_endpoint(db: Session = Depends(get_db)):
+    return get_users_per_role(db)
+
+@router.get("/signups", response_model=List[SignupCount], summary="User signups per day")
+async def get_signups_per_day_endpoint(since: Optional[date] = None, until: Optional[date] = None, db: Session = Depends(get_db)):
+    return get_signups_per_day(db, since, until)
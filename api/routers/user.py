@@ -1,34 +1,121 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from redis import Redis
-from elasticsearch import Elasticsearch
-from api.dependencies import get_db, get_redis, get_elasticsearch
-from api.schemas.user import UserCreate, UserUpdate, UserResponse, CacheData, CustomResponse
+from redis.asyncio import Redis
+from elasticsearch import AsyncElasticsearch
+from api.dependencies import SessionLocal, get_db, get_redis, get_elasticsearch, conditional_get
+from api.schemas.user import UserCreate, UserUpdate, UserResponse, CacheData, CustomResponse, BatchGetRequest, BatchUserResponse, ProjectedUserResponse, SuggestResponse
 from api.schemas.health import HealthStatus
-from api.services.user_service import store_user, get_all_users, get_user_by_id, update_user, soft_deleted_user, restore_user, hard_soft_deleted_user, get_all_soft_deleted_users
-from api.services.redis_service import cache_user_data, get_cached_user_data
-from api.services.elasticsearch_service import index_user, search_users
+from api.services.user_service import parse_projection, projection_key, get_all_users_projected, get_user_by_id_projected, get_users_by_ids_projected
+from api.services.user_service import store_user, get_all_users, get_user_by_id, get_users_by_ids, update_user, soft_deleted_user, restore_user, hard_soft_deleted_user, get_all_soft_deleted_users
+from api.services.redis_service import cache_user_data, get_cached_user_data, invalidate_cache, user_cache_key, get_cached_users, cache_users
+from api.services.redis_service import search_cache_suffix, get_cached_search, cache_search, bump_search_generation
+from api.services.elasticsearch_service import index_user, delete_user_document, search_users, suggest_users, INDEXED_FIELDS
+from api.services.side_effects import run_side_effects
+from api.services.archive_service import RestoreConflict
+from api.services.export_service import stream_users, EXPORT_FORMATS, CSV
+from api.services.version_service import bump_version, version_key, get_versions, USERS_SCOPE, ROLES_SCOPE
+from api.services.stats_service import record_role_assigned
 from api.models import User, Role, UserRole
-from typing import List, Tuple
+from api.config import settings
+from datetime import date
+from typing import Awaitable, List, Tuple, Optional, Union
+import asyncio
 import logging
 
 router = APIRouter(prefix="/users", tags=["users"])
 logger = logging.getLogger(__name__)
 
+FIELDS_QUERY = Query(None, description="Comma-separated user fields to return, e.g. id,name,email")
+INCLUDE_QUERY = Query(None, description="Relationships to embed: roles")
+
+def _projection(fields: str | None, include: str | None) -> tuple[list[str], bool] | None:
+    try:
+        return parse_projection(fields, include)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+def _in_order(rows: list, user_ids: list[int]) -> list:
+    """Reorder rows loaded with an IN query to follow `user_ids`."""
+    by_id = {row["id"] if isinstance(row, dict) else row.id: row for row in rows}
+    return [by_id[user_id] for user_id in user_ids if user_id in by_id]
+
+# Index writes still running after their request stopped waiting; kept so they are not garbage collected
+_search_writes: set[asyncio.Task] = set()
+
+async def _write_then_bump(redis: Redis, write: Awaitable):
+    try:
+        await write
+    finally:
+        await bump_search_generation(redis)
+
+def _search_write_done(task: asyncio.Task):
+    _search_writes.discard(task)
+    # Failures are logged by the index helpers; retrieve them so an abandoned task stays quiet
+    if not task.cancelled():
+        task.exception()
+
+async def _bump_search_after(redis: Redis, write: Awaitable):
+    """
+    Apply an index write and, once it has finished, move search caching to a new generation
+    so no result computed before the write is served after it. The pair runs as its own task:
+    if the side-effect timeout expires during refresh="wait_for", only the wait is cancelled
+    and the bump still follows the write instead of preceding it.
+    """
+    task = asyncio.ensure_future(_write_then_bump(redis, write))
+    _search_writes.add(task)
+    task.add_done_callback(_search_write_done)
+    await asyncio.shield(task)
+
+async def _reindex_user(es: AsyncElasticsearch, redis: Redis, user: UserResponse):
+    await _bump_search_after(redis, index_user(es, user, refresh="wait_for"))
+
+async def _unindex_user(es: AsyncElasticsearch, redis: Redis, user_id: int):
+    await _bump_search_after(redis, delete_user_document(es, user_id, refresh="wait_for"))
+
+async def _cached_projection(redis: Redis, cache_key: str | None, load):
+    """
+    Serve a projected result from its own cache key. Keys embed the request's ETag,
+    so any write produces new keys and stale projections simply expire.
+    """
+    if cache_key is not None:
+        cached = await get_cached_user_data(redis, cache_key)
+        if cached is not None:
+            return cached
+    data = load()
+    if cache_key is not None and data is not None:
+        await run_side_effects(cache=cache_user_data(redis, cache_key, data, ttl=300))
+    return data
+
 # Static routes first
 @router.get("/health", response_model=dict)
 async def health_check(
     db: Session = Depends(get_db),
     redis: Redis = Depends(get_redis),
-    es: Elasticsearch = Depends(get_elasticsearch)
+    es: AsyncElasticsearch = Depends(get_elasticsearch)
 ):
+    # The shared clients connect lazily, so ping them here rather than in the dependencies
+    failed = []
+    try:
+        await redis.ping()
+    except Exception as e:
+        failed.append("redis")
+        logger.error(f"Redis health check failed: {str(e)}")
+    try:
+        if not await es.ping():
+            raise ConnectionError("ping returned False")
+    except Exception as e:
+        failed.append("elasticsearch")
+        logger.error(f"Elasticsearch health check failed: {str(e)}")
+    if failed:
+        raise HTTPException(status_code=503, detail=f"Unavailable: {', '.join(failed)}")
     return {"status": "All services are up"}
 
 @router.get("/health-details", response_model=HealthStatus, summary="Detailed health check for all services")
 async def health_check_details(
     db: Session = Depends(get_db),
     redis: Redis = Depends(get_redis),
-    es: Elasticsearch = Depends(get_elasticsearch)
+    es: AsyncElasticsearch = Depends(get_elasticsearch)
 ):
     """Check connectivity to PostgreSQL, Redis, and Elasticsearch with detailed status."""
     status = {"postgresql": "connected", "redis": "connected", "elasticsearch": "connected"}
@@ -43,7 +130,7 @@ async def health_check_details(
         logger.error(f"PostgreSQL health check failed: {str(e)}")
 
     try:
-        redis.ping()
+        await redis.ping()
         details["redis"] = "PING returned PONG"
     except Exception as e:
         status["redis"] = "failed"
@@ -51,7 +138,7 @@ async def health_check_details(
         logger.error(f"Redis health check failed: {str(e)}")
 
     try:
-        es_health = es.cluster.health()
+        es_health = await es.cluster.health()
         status["elasticsearch"] = "connected" if es_health["status"] in ["green", "yellow"] else "failed"
         details["elasticsearch"] = f"Cluster health status: {es_health['status']}"
     except Exception as e:
@@ -72,27 +159,94 @@ async def get_all_soft_deleted_users_endpoint(db: Session = Depends(get_db)):
         logger.warning("No soft-deleted users found")
     return CustomResponse(code=200, message="get_all_soft_deleted_users", data=users)
 
+async def batch_get_users(user_ids: list[int], db: Session, redis: Redis) -> BatchUserResponse:
+    """
+    Resolve many users at once: one MGET for the per-user cache, one IN query for the
+    misses, and one pipelined backfill. `data` follows the requested order with null for
+    unknown ids. Entries are tagged with the roles version and the user's own version,
+    both read before the database, so a write that lands during a backfill turns the
+    entry it races with into a miss.
+    """
+    if len(user_ids) > settings.BATCH_GET_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BATCH_GET_MAX_IDS} ids per request")
+    unique_ids = list(dict.fromkeys(user_ids))
+    try:
+        cached, generations = await get_cached_users(
+            redis, unique_ids, version_key(ROLES_SCOPE), [version_key(USERS_SCOPE, user_id) for user_id in unique_ids]
+        )
+    except Exception as e:
+        logger.warning(f"Batch cache lookup failed: {str(e)}")
+        cached, generations = {}, {}
+    found = {user_id: UserResponse(**data) for user_id, data in cached.items()}
+
+    misses = [user_id for user_id in unique_ids if user_id not in found]
+    if misses:
+        unseeded = [user_id for user_id in misses if user_id in generations and generations[user_id] is None]
+        if unseeded:
+            # Versions not initialised yet: seed them before loading so the backfill has a generation
+            versions = await get_versions(redis, [version_key(ROLES_SCOPE)] + [version_key(USERS_SCOPE, user_id) for user_id in unseeded])
+            if versions:
+                generations.update({user_id: f"{versions[0]}:{version}" for user_id, version in zip(unseeded, versions[1:])})
+        loaded = get_users_by_ids(db, misses)
+        found.update({user.id: user for user in loaded})
+        if loaded and any(generations.get(user.id) for user in loaded):
+            await run_side_effects(cache=cache_users(redis, [user.dict() for user in loaded], generations, ttl=300))
+
+    not_found = [user_id for user_id in unique_ids if user_id not in found]
+    return BatchUserResponse(
+        code=200,
+        message="batch_get_users",
+        data=[found.get(user_id) for user_id in user_ids],
+        not_found=not_found,
+    )
+
+@router.post("/batch-get", response_model=BatchUserResponse, summary="Get many users by ID")
+async def batch_get_users_endpoint(request: BatchGetRequest, db: Session = Depends(get_db), redis: Redis = Depends(get_redis)):
+    return await batch_get_users(request.ids, db, redis)
+
 @router.post("", response_model=CustomResponse, summary="Store a new user")
-async def store_user_endpoint(user: UserCreate, db: Session = Depends(get_db), redis: Redis = Depends(get_redis), es: Elasticsearch = Depends(get_elasticsearch)):
+async def store_user_endpoint(user: UserCreate, db: Session = Depends(get_db), redis: Redis = Depends(get_redis), es: AsyncElasticsearch = Depends(get_elasticsearch)):
     try:
         db_user = store_user(db, user)
-        index_user(es, db_user)
-
-        try:
-            if redis.exists("all_users"):
-                redis.delete("all_users")
-                logger.info("Cache for 'all_users' invalidated due to new user creation.")
-        except Exception as e:
-            logger.warning(f"Failed to invalidate cache for 'all_users': {str(e)}")
-
-        return CustomResponse(code=201, message="store_user", data=[db_user])
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
-
-@router.get("", response_model=CustomResponse, summary="Get all users")
-async def get_all_users_endpoint(db: Session = Depends(get_db), redis: Redis = Depends(get_redis)):
-    cache_key = "all_users"
-    cached_data = get_cached_user_data(redis, cache_key)
+    await run_side_effects(
+        index=_reindex_user(es, redis, db_user),
+        version=bump_version(redis, USERS_SCOPE, db_user.id),
+    )
+    return CustomResponse(code=201, message="store_user", data=[db_user])
+
+@router.get("", response_model=Union[CustomResponse, ProjectedUserResponse, BatchUserResponse], summary="Get all users, or the users listed in ids")
+async def get_all_users_endpoint(
+    response: Response,
+    etag: str | None = Depends(conditional_get(USERS_SCOPE, ROLES_SCOPE)),
+    ids: Optional[str] = Query(None, description="Comma-separated user IDs, e.g. 1,2,3"),
+    fields: Optional[str] = FIELDS_QUERY,
+    include: Optional[str] = INCLUDE_QUERY,
+    db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis)
+):
+    if etag:
+        response.headers["ETag"] = etag
+    projection = _projection(fields, include)
+    if projection is not None:
+        if ids is not None:
+            raise HTTPException(status_code=422, detail="fields and include cannot be combined with ids")
+        columns, include_roles = projection
+        cache_key = f"all_users:{etag}:{projection_key(columns, include_roles)}" if etag else None
+        users = await _cached_projection(redis, cache_key, lambda: get_all_users_projected(db, columns, include_roles))
+        return ProjectedUserResponse(code=200, message="get_all_users", data=users)
+    if ids is not None:
+        try:
+            user_ids = [int(user_id) for user_id in ids.split(",") if user_id.strip()]
+        except ValueError:
+            raise HTTPException(status_code=422, detail="ids must be a comma-separated list of integers")
+        return await batch_get_users(user_ids, db, redis)
+
+    # Keyed by the ETag so a cached body is only ever served with the ETag it was built under;
+    # without an ETag (Redis unavailable) the list is not cached at all
+    cache_key = f"all_users:{etag}" if etag else None
+    cached_data = await get_cached_user_data(redis, cache_key) if cache_key else None
     if cached_data is not None:
         logger.info(f"Raw cached data: {cached_data}")
         try:
@@ -106,111 +260,179 @@ async def get_all_users_endpoint(db: Session = Depends(get_db), redis: Redis = D
         users_from_db = get_all_users(db)
       
         users = [UserResponse.from_orm(u) for u in users_from_db]
-        try:
-           
-            data_to_cache = [user.dict() for user in users]
-            cache_user_data(redis, "all_users", data_to_cache, ttl=300)
-            logger.info("All users data cached")
-        except Exception as e:
-            logger.error(f"Failed to cache data: {str(e)}")
+        if cache_key:
+            try:
+                data_to_cache = [user.dict() for user in users]
+                await cache_user_data(redis, cache_key, data_to_cache, ttl=300)
+                logger.info("All users data cached")
+            except Exception as e:
+                logger.error(f"Failed to cache data: {str(e)}")
     return CustomResponse(code=200, message="get_all_users", data=users)
 
+@router.get("/search", response_model=Union[CustomResponse, ProjectedUserResponse], summary="Search users by name or email")
+async def search_users_endpoint(
+    q: str,
+    fields: Optional[str] = FIELDS_QUERY,
+    include: Optional[str] = INCLUDE_QUERY,
+    redis: Redis = Depends(get_redis),
+    es: AsyncElasticsearch = Depends(get_elasticsearch)
+):
+    projection = _projection(fields, include)
+    suffix = search_cache_suffix(q, projection=projection_key(*projection) if projection else None)
+    try:
+        generation, cached = await get_cached_search(redis, suffix)
+    except Exception as e:
+        logger.warning(f"Search cache lookup failed: {str(e)}")
+        generation, cached = None, None
+    if cached is not None:
+        if projection is None:
+            return CustomResponse(code=200, message="search_users", data=[UserResponse(**user) for user in cached])
+        return ProjectedUserResponse(code=200, message="search_users", data=cached)
+
+    if projection is not None and not projection[1] and all(name in INDEXED_FIELDS for name in projection[0]):
+        # Everything requested is in the index: answer from the search hits alone
+        users = await search_users(es, q, projection[0])
+    else:
+        user_ids = [hit["id"] for hit in await search_users(es, q, ["id"])]
+        # Only hydration needs Postgres, so cache hits and index-only answers never take a pool connection
+        with SessionLocal() as db:
+            if projection is None:
+                users = _in_order(get_users_by_ids(db, user_ids), user_ids)
+            else:
+                columns, include_roles = projection
+                users = _in_order(get_users_by_ids_projected(db, user_ids, columns, include_roles), user_ids)
+
+    if generation is not None:
+        results = [user.dict() for user in users] if projection is None else users
+        await run_side_effects(cache=cache_search(redis, generation, suffix, results, settings.SEARCH_CACHE_TTL))
+    if projection is None:
+        return CustomResponse(code=200, message="search_users", data=users)
+    return ProjectedUserResponse(code=200, message="search_users", data=users)
+
+@router.get("/suggest", response_model=SuggestResponse, summary="Typeahead lookup of users by name or email prefix")
+async def suggest_users_endpoint(
+    q: str = Query(..., max_length=100),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum results, capped at SUGGEST_MAX_RESULTS"),
+    es: AsyncElasticsearch = Depends(get_elasticsearch)
+):
+    limit = min(limit or settings.SUGGEST_MAX_RESULTS, settings.SUGGEST_MAX_RESULTS)
+    users = await suggest_users(es, q, limit)
+    return SuggestResponse(code=200, message="suggest_users", data=users)
+
+@router.get("/export", summary="Stream all users with their role names as CSV or NDJSON")
+async def export_users_endpoint(
+    format: str = Query(CSV, description="csv or ndjson"),
+    updated_since: Optional[date] = Query(None, description="Only users created or updated on or after this date"),
+    include_deleted: bool = False,
+    gzip: bool = False
+):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    media_type = "text/csv" if format == CSV else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="users.{format}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(stream_users(format, updated_since, include_deleted, gzip), media_type=media_type, headers=headers)
+
 # Parameterized routes after static routes
-@router.get("/{user_id}", response_model=CustomResponse, summary="Get user by ID")
-async def get_user_by_id_endpoint(user_id: int, db: Session = Depends(get_db)):
-    user = get_user_by_id(db, user_id)
+@router.get("/{user_id}", response_model=Union[CustomResponse, ProjectedUserResponse], summary="Get user by ID")
+async def get_user_by_id_endpoint(
+    user_id: int,
+    response: Response,
+    etag: str | None = Depends(conditional_get(USERS_SCOPE, ROLES_SCOPE, id_param="user_id")),
+    fields: Optional[str] = FIELDS_QUERY,
+    include: Optional[str] = INCLUDE_QUERY,
+    db: Session = Depends(get_db),
+    redis: Redis = Depends(get_redis)
+):
+    projection = _projection(fields, include)
+    if projection is None:
+        user = get_user_by_id(db, user_id)
+    else:
+        columns, include_roles = projection
+        cache_key = f"user:{user_id}:{etag}:{projection_key(columns, include_roles)}" if etag else None
+        user = await _cached_projection(redis, cache_key, lambda: get_user_by_id_projected(db, user_id, columns, include_roles))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    if etag:
+        response.headers["ETag"] = etag
+    if projection is not None:
+        return ProjectedUserResponse(code=200, message="get_user_by_id", data=[user])
     return CustomResponse(code=200, message="get_user_by_id", data=[user])
 
 @router.put("/{user_id}", response_model=CustomResponse, summary="Update a user")
-async def update_user_endpoint(user_id: int, user: UserUpdate, db: Session = Depends(get_db), redis: Redis = Depends(get_redis), es: Elasticsearch = Depends(get_elasticsearch)):
+async def update_user_endpoint(user_id: int, user: UserUpdate, db: Session = Depends(get_db), redis: Redis = Depends(get_redis), es: AsyncElasticsearch = Depends(get_elasticsearch)):
     db_user = update_user(db, user_id, user)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
-    index_user(es, db_user)
-
-    try:
-        if redis.exists("all_users"):
-            redis.delete("all_users")
-            logger.info("Cache for 'all_users' invalidated due to user update.")
-    except Exception as e:
-        logger.warning(f"Failed to invalidate cache for 'all_users': {str(e)}")
+    await run_side_effects(
+        index=_reindex_user(es, redis, db_user),
+        cache=invalidate_cache(redis, user_cache_key(user_id)),
+        version=bump_version(redis, USERS_SCOPE, user_id),
+    )
 
     return CustomResponse(code=200, message="update_user", data=[db_user])
 
 @router.put("/soft-delete/{user_id}", response_model=CustomResponse, summary="Soft delete a user")
-async def soft_deleted_user_endpoint(user_id: int, db: Session = Depends(get_db), redis: Redis = Depends(get_redis), es: Elasticsearch = Depends(get_elasticsearch)):
+async def soft_deleted_user_endpoint(user_id: int, db: Session = Depends(get_db), redis: Redis = Depends(get_redis), es: AsyncElasticsearch = Depends(get_elasticsearch)):
     success, message = soft_deleted_user(db, user_id)
     if not success:
         raise HTTPException(status_code=404, detail=message)
-    try:
-        es.delete(index="users", id=str(user_id))
-        logger.info(f"Soft deleted user {user_id} from Elasticsearch")
-    except Exception as e:
-        logger.error(f"Failed to soft delete user {user_id} from Elasticsearch: {str(e)}")
-
-    try:
-        if redis.exists("all_users"):
-            redis.delete("all_users")
-            logger.info("Cache for 'all_users' invalidated due to user soft-delete.")
-    except Exception as e:
-        logger.warning(f"Failed to invalidate cache for 'all_users': {str(e)}")
+    await run_side_effects(
+        index=_unindex_user(es, redis, user_id),
+        cache=invalidate_cache(redis, user_cache_key(user_id)),
+        version=bump_version(redis, USERS_SCOPE, user_id),
+    )
 
     return CustomResponse(code=200, message="soft_deleted_user", data=[])
 
 @router.post("/restore/{user_id}", response_model=CustomResponse, summary="Restore a user")
-async def restore_user_endpoint(user_id: int, db: Session = Depends(get_db), redis: Redis = Depends(get_redis)):
-    success = restore_user(db, user_id)
+async def restore_user_endpoint(user_id: int, db: Session = Depends(get_db), redis: Redis = Depends(get_redis), es: AsyncElasticsearch = Depends(get_elasticsearch)):
+    try:
+        success = restore_user(db, user_id)
+    except RestoreConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
     if not success:
         raise HTTPException(status_code=404, detail="User not found or not soft deleted")
-    
-    try:
-        if redis.exists("all_users"):
-            redis.delete("all_users")
-            logger.info("Cache for 'all_users' invalidated due to user restore.")
-    except Exception as e:
-        logger.warning(f"Failed to invalidate cache for 'all_users': {str(e)}")
+    await run_side_effects(
+        # Soft delete removed the document, so put it back
+        index=_reindex_user(es, redis, get_user_by_id(db, user_id)),
+        cache=invalidate_cache(redis, user_cache_key(user_id)),
+        version=bump_version(redis, USERS_SCOPE, user_id),
+    )
 
     return CustomResponse(code=200, message="restore_user", data=[])
 
 @router.delete("/{user_id}", response_model=CustomResponse, summary="Hard delete a user")
-async def hard_soft_deleted_user_endpoint(user_id: int, db: Session = Depends(get_db), redis: Redis = Depends(get_redis), es: Elasticsearch = Depends(get_elasticsearch)):
-    success = hard_soft_deleted_user(db, es, user_id)
+async def hard_soft_deleted_user_endpoint(user_id: int, db: Session = Depends(get_db), redis: Redis = Depends(get_redis), es: AsyncElasticsearch = Depends(get_elasticsearch)):
+    success = hard_soft_deleted_user(db, user_id)
     if not success:
         raise HTTPException(status_code=404, detail="User not found or cannot be deleted")
-
-    try:
-        if redis.exists("all_users"):
-            redis.delete("all_users")
-            logger.info("Cache for 'all_users' invalidated due to user hard-delete.")
-    except Exception as e:
-        logger.warning(f"Failed to invalidate cache for 'all_users': {str(e)}")
+    await run_side_effects(
+        index=_unindex_user(es, redis, user_id),
+        cache=invalidate_cache(redis, user_cache_key(user_id)),
+        version=bump_version(redis, USERS_SCOPE, user_id),
+    )
 
     return CustomResponse(code=200, message="hard_soft_deleted_user", data=[])
 
 @router.post("/cache/{user_id}", response_model=CustomResponse)
 async def cache_user_data_endpoint(user_id: int, data: CacheData, redis: Redis = Depends(get_redis)):
-    cache_user_data(redis, user_id, data.data)
+    await cache_user_data(redis, user_id, data.data)
     return CustomResponse(code=200, message="cache_user_data", data=[])
 
 @router.get("/cache/{user_id}", response_model=CustomResponse)
 async def get_cached_user_data_endpoint(user_id: int, redis: Redis = Depends(get_redis)):
-    data = get_cached_user_data(redis, user_id)
+    data = await get_cached_user_data(redis, user_id)
     if data is None:
         raise HTTPException(status_code=404, detail="Cached data not found")
     return CustomResponse(code=200, message="get_cached_user_data", data=[{"user_id": user_id, "data": data}])
 
-@router.get("/search", response_model=CustomResponse)
-async def search_users_endpoint(q: str, es: Elasticsearch = Depends(get_elasticsearch)):
-    users = search_users(es, q)
-    return CustomResponse(code=200, message="search_users", data=users)
-
 @router.post("/assign-role/{user_id}", response_model=CustomResponse, summary="Assign a role to a user")
-async def assign_role_to_user(user_id: int, role_id: int, db: Session = Depends(get_db), redis: Redis = Depends(get_redis), es: Elasticsearch = Depends(get_elasticsearch)):
+async def assign_role_to_user(user_id: int, role_id: int, db: Session = Depends(get_db), redis: Redis = Depends(get_redis), es: AsyncElasticsearch = Depends(get_elasticsearch)):
     try:
         logger.info(f"Attempting to assign role {role_id} to user {user_id}")
-        user = get_user_by_id(db, user_id)
+        user = db.query(User).filter(User.id == user_id, User.deleted_at == None).first()
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         logger.info(f"User {user_id} retrieved: {user}")
@@ -226,24 +448,17 @@ async def assign_role_to_user(user_id: int, role_id: int, db: Session = Depends(
 
         user.roles.append(role)
         logger.info(f"Role {role_id} appended to user {user_id}")
+        record_role_assigned(db, role_id)
         db.commit()
         logger.info(f"Database commit successful for user {user_id}")
 
-        try:
-            if redis.exists("all_users"):
-                redis.delete("all_users")
-                logger.info("Cache for 'all_users' invalidated.")
-        except Exception as e:
-            logger.warning(f"Failed to invalidate cache for 'all_users': {str(e)}")
-
-
         user_response = UserResponse.from_orm(user)
         logger.info(f"UserResponse created for user {user_id}: {user_response}")
-        try:
-            index_user(es, user_response)
-            logger.info(f"User {user_id} indexed in Elasticsearch")
-        except Exception as e:
-            logger.warning(f"Failed to index user {user_id} in Elasticsearch: {str(e)}")
+        await run_side_effects(
+            index=_reindex_user(es, redis, user_response),
+            cache=invalidate_cache(redis, user_cache_key(user_id)),
+            version=bump_version(redis, USERS_SCOPE, user_id),
+        )
         return CustomResponse(code=200, message="assign_role_to_user", data=[user_response])
     except HTTPException as e:
         raise e
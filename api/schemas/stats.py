@@ -0,0 +1,47 @@
+from pydantic import BaseModel
+from datetime import date
+
+class UserTotals(BaseModel):
+    total: int
+    active: int
+    soft_deleted: int
+    soft_deleted_ratio: float
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "total": 120,
+                "active": 100,
+                "soft_deleted": 20,
+                "soft_deleted_ratio": 0.1667
+            }
+        }
+
+class RoleUserCount(BaseModel):
+    role_id: int
+    name: str
+    users: int
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "role_id": 1,
+                "name": "admin",
+                "users": 4
+            }
+        }
+
+class SignupCount(BaseModel):
+    day: date
+    count: int
+
+    class Config:
+        json_encoders = {
+            date: lambda v: v.isoformat() if v else None
+        }
+        json_schema_extra = {
+            "example": {
+                "day": "2025-07-02",
+                "count": 12
+            }
+        }
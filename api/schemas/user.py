@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import date
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from api.schemas.role import RoleResponse
 
 class UserCreate(BaseModel):
@@ -75,6 +75,16 @@ class CacheData(BaseModel):
             }
         }
 
+class BatchGetRequest(BaseModel):
+    ids: List[int]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "ids": [1, 2, 3]
+            }
+        }
+
 class CustomResponse(BaseModel):
     code: int
     message: str
@@ -82,3 +92,45 @@ class CustomResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+class BatchUserResponse(BaseModel):
+    code: int
+    message: str
+    data: List[Optional[UserResponse]]
+    not_found: List[int]
+
+    class Config:
+        from_attributes = True
+
+class ProjectedUserResponse(BaseModel):
+    code: int
+    message: str
+    data: List[Dict[str, Any]]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "code": 200,
+                "message": "get_all_users",
+                "data": [{"id": 1, "name": "Alice", "email": "alice@example.com"}]
+            }
+        }
+
+class UserSuggestion(BaseModel):
+    id: int
+    name: str
+    email: str
+
+class SuggestResponse(BaseModel):
+    code: int
+    message: str
+    data: List[UserSuggestion]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "code": 200,
+                "message": "suggest_users",
+                "data": [{"id": 1, "name": "Alice", "email": "alice@example.com"}]
+            }
+        }
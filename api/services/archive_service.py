@@ -0,0 +1,128 @@
+from datetime import date, timedelta
+from typing import Callable
+from sqlalchemy import select, insert, delete, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from api.models import User, Role, UserRole, UserArchive, RoleArchive, UserRoleArchive
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RestoreConflict(Exception):
+    """An archived row cannot be restored because a live row now holds one of its unique values."""
+
+USER_COLUMNS = ["id", "name", "email", "is_default", "can_deleted", "created_at", "updated_at", "deleted_at"]
+ROLE_COLUMNS = ["id", "name", "is_default", "can_deleted", "created_at", "updated_at", "deleted_at"]
+
+def _row_bytes(db: Session, table: str, column: str, ids: list[int]) -> int:
+    """Sum of on-disk tuple sizes for the rows about to be moved out of `table`."""
+    return db.execute(
+        text(f'SELECT COALESCE(SUM(pg_column_size(t.*)), 0) FROM "{table}" t WHERE t.{column} = ANY(:ids)'),
+        {"ids": ids},
+    ).scalar()
+
+def _move_rows(db: Session, source, target, columns: list[str], condition) -> int:
+    """Copy the rows of `source` matching `condition` into `target`, then delete them from `source`."""
+    db.execute(
+        insert(target).from_select(columns, select(*[getattr(source, c) for c in columns]).where(condition))
+    )
+    result = db.execute(delete(source).where(condition).execution_options(synchronize_session=False))
+    return result.rowcount
+
+def _archive_batches(db: Session, model, archive_model, columns: list[str], table: str, link_column, cutoff: date, batch_size: int,
+                     on_batch: Callable[[list[int], int], None] | None = None) -> dict:
+    report = {"rows": 0, "links": 0, "bytes": 0}
+    while True:
+        ids = db.execute(
+            select(model.id)
+            .where(model.deleted_at != None, model.deleted_at < cutoff)
+            .order_by(model.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not ids:
+            break
+        report["bytes"] += _row_bytes(db, table, "id", ids) + _row_bytes(db, "user_role", link_column.key, ids)
+        links = _move_rows(db, UserRole, UserRoleArchive, ["user_id", "role_id"], link_column.in_(ids))
+        report["links"] += links
+        report["rows"] += _move_rows(db, model, archive_model, columns, model.id.in_(ids))
+        db.commit()
+        logger.info(f"Archived batch of {len(ids)} rows from {table}")
+        if on_batch is not None:
+            on_batch(ids, links)
+    return report
+
+def archive_soft_deleted(db: Session, retention_days: int, batch_size: int,
+                         on_role_batch: Callable[[list[int], int], None] | None = None) -> dict:
+    """
+    Move users and roles soft-deleted more than `retention_days` ago into the archive tables,
+    together with their user_role links, committing every `batch_size` rows.
+    `bytes_reclaimed` is the tuple size removed from the hot tables; the space itself is
+    reused by Postgres once autovacuum has processed them.
+
+    Archiving a role also takes it off the live users it was assigned to, so
+    `on_role_batch(role_ids, links_moved)` is called after each committed role batch
+    to let the caller invalidate what was derived from those links.
+    """
+    cutoff = date.today() - timedelta(days=retention_days)
+    users = _archive_batches(db, User, UserArchive, USER_COLUMNS, "user", UserRole.user_id, cutoff, batch_size)
+    roles = _archive_batches(db, Role, RoleArchive, ROLE_COLUMNS, "role", UserRole.role_id, cutoff, batch_size, on_role_batch)
+    report = {
+        "users_archived": users["rows"],
+        "roles_archived": roles["rows"],
+        "user_roles_archived": users["links"] + roles["links"],
+        "bytes_reclaimed": users["bytes"] + roles["bytes"],
+    }
+    logger.info(f"Archive run finished (cutoff {cutoff.isoformat()}): {report}")
+    return report
+
+def _restore_links(db: Session, condition):
+    """Move archived links back to user_role once both of their ends are live again."""
+    live = condition & UserRoleArchive.user_id.in_(select(User.id)) & UserRoleArchive.role_id.in_(select(Role.id))
+    _move_rows(db, UserRoleArchive, UserRole, ["user_id", "role_id"], live)
+
+def delete_archived_links(db: Session, condition):
+    """Drop archived links matching `condition`, e.g. when one of their ends is hard deleted. The caller commits."""
+    db.execute(delete(UserRoleArchive).where(condition).execution_options(synchronize_session=False))
+
+def restore_archived_user(db: Session, user_id: int) -> bool:
+    """
+    Move an archived user and its restorable links back into the live tables. The caller commits.
+    Returns False if the user is not archived; raises RestoreConflict if its email is taken.
+    """
+    archived = db.get(UserArchive, user_id)
+    if not archived:
+        return False
+    try:
+        db.add(User(**{c: getattr(archived, c) for c in USER_COLUMNS if c != "deleted_at"}))
+        db.flush()
+        _restore_links(db, UserRoleArchive.user_id == user_id)
+        db.delete(archived)
+        db.flush()
+    except IntegrityError as e:
+        db.rollback()
+        logger.warning(f"Cannot restore archived user {user_id}: {str(e)}")
+        raise RestoreConflict(f"User {user_id} cannot be restored: its email is already in use") from e
+    logger.info(f"Restored archived user {user_id}")
+    return True
+
+def restore_archived_role(db: Session, role_id: int) -> bool:
+    """
+    Move an archived role and its restorable links back into the live tables. The caller commits.
+    Returns False if the role is not archived; raises RestoreConflict if its name is taken.
+    """
+    archived = db.get(RoleArchive, role_id)
+    if not archived:
+        return False
+    try:
+        db.add(Role(**{c: getattr(archived, c) for c in ROLE_COLUMNS if c != "deleted_at"}))
+        db.flush()
+        _restore_links(db, UserRoleArchive.role_id == role_id)
+        db.delete(archived)
+        db.flush()
+    except IntegrityError as e:
+        db.rollback()
+        logger.warning(f"Cannot restore archived role {role_id}: {str(e)}")
+        raise RestoreConflict(f"Role {role_id} cannot be restored: its name is already in use") from e
+    logger.info(f"Restored archived role {role_id}")
+    return True
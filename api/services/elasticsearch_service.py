@@ -1,15 +1,54 @@
-from elasticsearch import Elasticsearch
+import asyncio
+from elasticsearch import AsyncElasticsearch
 from api.schemas.user import UserResponse
 import logging
 
 logger = logging.getLogger(__name__)
 
-def index_user(es: Elasticsearch, user: UserResponse):
-    """Index a user in Elasticsearch."""
+# Fields available in the users index, and therefore servable without a database read
+INDEXED_FIELDS = ("id", "name", "email", "created_at")
+
+USERS_INDEX_MAPPINGS = {
+    "properties": {
+        "name": {
+            "type": "text",
+            "fields": {"keyword": {"type": "keyword", "ignore_above": 256}, "suggest": {"type": "search_as_you_type"}}
+        },
+        "email": {
+            "type": "text",
+            "fields": {"keyword": {"type": "keyword", "ignore_above": 256}, "suggest": {"type": "search_as_you_type"}}
+        },
+        "created_at": {"type": "date"}
+    }
+}
+SUGGEST_FIELDS = [
+    f"{field}.suggest{suffix}" for field in ("name", "email") for suffix in ("", "._2gram", "._3gram")
+]
+
+async def ensure_users_index(es: AsyncElasticsearch):
+    """
+    Create the users index with its typeahead sub-fields, or add them to an index created
+    by dynamic mapping and re-index its documents in the background so they pick them up.
+    """
+    if not await es.indices.exists(index="users"):
+        await es.indices.create(index="users", mappings=USERS_INDEX_MAPPINGS)
+        logger.info("Created Elasticsearch index 'users'")
+        return
+    mapping = await es.indices.get_mapping(index="users")
+    properties = mapping["users"]["mappings"].get("properties", {})
+    if all("suggest" in properties.get(field, {}).get("fields", {}) for field in ("name", "email")):
+        return
+    await es.indices.put_mapping(index="users", properties=USERS_INDEX_MAPPINGS["properties"])
+    await es.update_by_query(index="users", conflicts="proceed", wait_for_completion=False)
+    logger.info("Added suggest sub-fields to index 'users'; re-indexing existing documents")
+
+async def index_user(es: AsyncElasticsearch, user: UserResponse, refresh: bool | str = False):
+    """Index a user in Elasticsearch; pass refresh="wait_for" to return once it is searchable."""
     try:
-        es.index(
+        await es.index(
             index="users",
             id=str(user.id),
+            refresh=refresh,
             body={
                 "name": user.name,
                 "email": user.email,
@@ -21,10 +60,24 @@ def index_user(es: Elasticsearch, user: UserResponse):
         logger.error(f"Failed to index user {user.id}: {str(e)}")
         raise
 
-def search_users(es: Elasticsearch, query: str) -> list[UserResponse]:
-    """Search for users in Elasticsearch by name or email."""
+async def delete_user_document(es: AsyncElasticsearch, user_id: int, refresh: bool | str = False):
+    """Remove a user from the Elasticsearch index."""
+    try:
+        await es.delete(index="users", id=str(user_id), refresh=refresh)
+        logger.info(f"Deleted user {user_id} from Elasticsearch")
+    except Exception as e:
+        logger.error(f"Failed to delete user {user_id} from Elasticsearch: {str(e)}")
+        raise
+
+async def search_users(es: AsyncElasticsearch, query: str, fields: list[str] | None = None) -> list[dict]:
+    """
+    Search for users in Elasticsearch by name or email, in relevance order.
+    Each hit is returned as a dict with `id` plus the requested indexed `fields`
+    (all indexed fields by default).
+    """
+    source = [name for name in (fields or INDEXED_FIELDS) if name != "id"]
     try:
-        response = es.search(
+        response = await es.search(
             index="users",
             body={
                 "query": {
@@ -32,20 +85,49 @@ def search_users(es: Elasticsearch, query: str) -> list[UserResponse]:
                         "query": query,
                         "fields": ["name", "email"]
                     }
-                }
+                },
+                "_source": source or False
             }
         )
-        users = [
-            UserResponse(
-                id=int(hit["_id"]),
-                name=hit["_source"]["name"],
-                email=hit["_source"]["email"],
-                created_at=hit["_source"]["created_at"]
-            )
-            for hit in response["hits"]["hits"]
-        ]
+        users = [{"id": int(hit["_id"]), **hit.get("_source", {})} for hit in response["hits"]["hits"]]
         logger.info(f"Found {len(users)} users for query: {query}")
         return users
     except Exception as e:
         logger.error(f"Search failed: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+# In-flight suggest queries keyed by (prefix, limit); concurrent identical keystrokes share one ES call
+_inflight_suggestions: dict[tuple[str, int], asyncio.Task] = {}
+
+async def _suggest(es: AsyncElasticsearch, prefix: str, limit: int) -> list[dict]:
+    response = await es.search(
+        index="users",
+        query={"multi_match": {"query": prefix, "type": "bool_prefix", "fields": SUGGEST_FIELDS}},
+        source=["name", "email"],
+        size=limit,
+        filter_path=["hits.hits._id", "hits.hits._source"],
+    )
+    hits = response.get("hits", {}).get("hits", [])
+    return [{"id": int(hit["_id"]), "name": hit["_source"]["name"], "email": hit["_source"]["email"]} for hit in hits]
+
+async def suggest_users(es: AsyncElasticsearch, prefix: str, limit: int) -> list[dict]:
+    """
+    Typeahead lookup of users whose name or email starts with `prefix`.
+    Identical prefix queries already in flight are awaited rather than sent again.
+    """
+    key = (prefix.strip().lower(), limit)
+    if not key[0]:
+        return []
+    task = _inflight_suggestions.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_suggest(es, key[0], limit))
+        _inflight_suggestions[key] = task
+        task.add_done_callback(lambda _: _inflight_suggestions.pop(key, None))
+    else:
+        logger.info(f"Coalesced suggest query for prefix: {key[0]}")
+    try:
+        # Shielded so one caller disconnecting does not cancel the lookup for the others
+        return await asyncio.shield(task)
+    except Exception as e:
+        logger.error(f"Suggest failed for prefix {key[0]}: {str(e)}")
+        raise
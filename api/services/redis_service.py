@@ -1,6 +1,7 @@
+import hashlib
 import json
 from datetime import date
-from redis import Redis
+from redis.asyncio import Redis
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,25 +12,25 @@ def json_serializer(obj):
         return obj.isoformat()
     raise TypeError(f"Type {type(obj)} not serializable")
 
-def cache_user_data(redis_client: Redis, key: str, cache_data: list, ttl: int = 3600):
+async def cache_user_data(redis_client: Redis, key: str, cache_data: list, ttl: int = 3600):
     """
     Cache a list of user data under the specified key with a TTL.
     Uses a custom JSON serializer to handle date objects.
     """
     try:
         serialized_data = json.dumps(cache_data, default=json_serializer)
-        redis_client.set(key, serialized_data, ex=ttl)
+        await redis_client.set(key, serialized_data, ex=ttl)
         logger.info(f"Successfully cached data for key: {key}")
     except TypeError as e:
         logger.error(f"Failed to serialize data for caching: {e}")
         raise
 
-def get_cached_user_data(redis_client: Redis, key: str) -> list | None:
+async def get_cached_user_data(redis_client: Redis, key: str) -> list | None:
     """
     Retrieve cached data for the specified key.
     """
     try:
-        cached_data = redis_client.get(key)
+        cached_data = await redis_client.get(key)
         if cached_data:
             logger.info(f"Cache hit for key: {key}")
             return json.loads(cached_data)
@@ -39,3 +40,90 @@ def get_cached_user_data(redis_client: Redis, key: str) -> list | None:
         logger.error(f"Failed to retrieve or parse cached data for key {key}: {e}")
         return None
 
+async def invalidate_cache(redis_client: Redis, *keys: str):
+    """
+    Drop the given cache keys with a single DEL; missing keys are ignored by Redis.
+    """
+    deleted = await redis_client.delete(*keys)
+    logger.info(f"Invalidated {deleted} cache key(s): {', '.join(keys)}")
+
+def user_cache_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+async def get_cached_users(redis_client: Redis, user_ids: list[int], shared_key: str, user_keys: list[str]) -> tuple[dict[int, dict], dict[int, str | None]]:
+    """
+    Fetch the per-user cache entries for `user_ids` in a single MGET, together with the
+    version counters they are tagged with: `shared_key` for all users and `user_keys[i]`
+    for `user_ids[i]`. An entry is a hit only if it was written under the current
+    generation of its user; the generation is None while either counter is missing.
+    """
+    values = await redis_client.mget([shared_key] + [user_cache_key(user_id) for user_id in user_ids] + user_keys)
+    shared, entries, versions = values[0], values[1:len(user_ids) + 1], values[len(user_ids) + 1:]
+    hits, generations = {}, {}
+    for user_id, entry, version in zip(user_ids, entries, versions):
+        generation = f"{shared}:{version}" if shared is not None and version is not None else None
+        generations[user_id] = generation
+        if not entry or generation is None:
+            continue
+        try:
+            entry = json.loads(entry)
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable cache entry for user {user_id}: {e}")
+            continue
+        if entry.get("generation") == generation:
+            hits[user_id] = entry["data"]
+    logger.info(f"Batch cache lookup: {len(hits)} hit(s), {len(user_ids) - len(hits)} miss(es)")
+    return hits, generations
+
+async def cache_users(redis_client: Redis, users: list[dict], generations: dict[int, str], ttl: int = 300):
+    """
+    Backfill per-user cache entries, each tagged with its generation from `generations`,
+    in one pipelined round trip. Users without a generation are skipped.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    cached = 0
+    for user in users:
+        generation = generations.get(user["id"])
+        if generation is None:
+            continue
+        entry = json.dumps({"generation": generation, "data": user}, default=json_serializer)
+        pipe.set(user_cache_key(user["id"]), entry, ex=ttl)
+        cached += 1
+    await pipe.execute()
+    logger.info(f"Cached {cached} user(s)")
+
+SEARCH_GENERATION_KEY = "search:generation"
+
+# Reads the generation and the entry stored under it in one round trip
+_GET_CACHED_SEARCH_SCRIPT = """
+local generation = redis.call('GET', KEYS[1]) or '0'
+return {generation, redis.call('GET', 'search:' .. generation .. ':' .. ARGV[1])}
+"""
+
+def search_cache_suffix(query: str, **params) -> str:
+    """Stable digest of the normalized query text and its parameters."""
+    normalized = " ".join(query.lower().split())
+    payload = json.dumps({"q": normalized, **params}, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+async def get_cached_search(redis_client: Redis, suffix: str) -> tuple[str, list | None]:
+    """
+    Return the current search generation and the results cached for `suffix` under it.
+    Entries from earlier generations are never read again and expire on their own.
+    """
+    script = redis_client.register_script(_GET_CACHED_SEARCH_SCRIPT)
+    generation, cached = await script(keys=[SEARCH_GENERATION_KEY], args=[suffix])
+    if cached is None:
+        logger.info(f"Search cache miss (generation {generation})")
+        return generation, None
+    logger.info(f"Search cache hit (generation {generation})")
+    return generation, json.loads(cached)
+
+async def cache_search(redis_client: Redis, generation: str, suffix: str, results: list, ttl: int):
+    serialized = json.dumps(results, default=json_serializer)
+    await redis_client.set(f"search:{generation}:{suffix}", serialized, ex=ttl)
+
+async def bump_search_generation(redis_client: Redis):
+    """Invalidate every cached search result at once."""
+    generation = await redis_client.incr(SEARCH_GENERATION_KEY)
+    logger.info(f"Search generation bumped to {generation}")
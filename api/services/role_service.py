@@ -1,7 +1,9 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from api.models import Role
+from api.models import Role, RoleArchive, UserRoleArchive
 from api.schemas.role import RoleCreate, RoleUpdate, RoleResponse
+from api.services.archive_service import restore_archived_role, delete_archived_links
+from api.services.stats_service import record_role_deleted, refresh_role_users
 import logging
 from typing import List
 
@@ -44,22 +46,27 @@ def soft_deleted_role(db: Session, role_id: int) -> bool:
 
 def restore_role(db: Session, role_id: int) -> bool:
     db_role = db.query(Role).filter(Role.id == role_id, Role.deleted_at != None).first()
-    if not db_role:
+    if db_role:
+        db_role.deleted_at = None
+    elif restore_archived_role(db, role_id):
+        refresh_role_users(db, role_id)
+    else:
         return False
-    db_role.deleted_at = None
     db.commit()
     logger.info(f"Restored role {role_id}")
     return True
 
 def hard_soft_deleted_role(db: Session, role_id: int) -> bool:
-    db_role = db.query(Role).filter(Role.id == role_id).first()
+    db_role = db.query(Role).filter(Role.id == role_id).first() or db.get(RoleArchive, role_id)
     if not db_role or not db_role.can_deleted:
         return False
+    record_role_deleted(db, role_id)
+    delete_archived_links(db, UserRoleArchive.role_id == role_id)
     db.delete(db_role)
     db.commit()
     logger.info(f"Hard deleted role {role_id}")
     return True
 
 def get_all_soft_deleted_roles(db: Session) -> List[Role]:
-    return db.query(Role).filter(Role.deleted_at != None).all()
+    return db.query(Role).filter(Role.deleted_at != None).all() + db.query(RoleArchive).all()
 
@@ -0,0 +1,24 @@
+import asyncio
+from typing import Awaitable
+from api.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def run_side_effects(timeout: float | None = None, **effects: Awaitable):
+    """
+    Run independent post-write side effects (indexing, cache invalidation, version bumps)
+    concurrently, each bounded by `timeout`. Failures and timeouts are logged, never raised,
+    since the database write they follow has already been committed.
+    """
+    timeout = settings.SIDE_EFFECT_TIMEOUT if timeout is None else timeout
+    names = list(effects)
+    results = await asyncio.gather(
+        *(asyncio.wait_for(effect, timeout) for effect in effects.values()),
+        return_exceptions=True,
+    )
+    for name, result in zip(names, results):
+        if isinstance(result, asyncio.TimeoutError):
+            logger.warning(f"Side effect '{name}' timed out after {timeout}s")
+        elif isinstance(result, Exception):
+            logger.warning(f"Side effect '{name}' failed: {str(result)}")
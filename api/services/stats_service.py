@@ -0,0 +1,132 @@
+from datetime import date
+from sqlalchemy import select, delete, func, literal, text, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from api.models import User, Role, UserRole, UserArchive, UserStat, UserSignupStat, RoleUserStat
+import logging
+
+logger = logging.getLogger(__name__)
+
+# The summary tables are only ever adjusted inside the caller's transaction, so they
+# commit (or roll back) together with the write that changed the underlying rows.
+
+ACTIVE = "active"
+SOFT_DELETED = "soft_deleted"
+
+def _add_user_stat(db: Session, name: str, delta: int):
+    stmt = insert(UserStat).values(name=name, value=delta)
+    db.execute(stmt.on_conflict_do_update(index_elements=[UserStat.name], set_={"value": UserStat.value + stmt.excluded.value}))
+
+def _add_signups(db: Session, day, delta: int):
+    stmt = insert(UserSignupStat).values(day=day, count=delta)
+    db.execute(stmt.on_conflict_do_update(index_elements=[UserSignupStat.day], set_={"count": UserSignupStat.count + stmt.excluded.count}))
+
+def _add_role_users(db: Session, user_id: int, delta: int):
+    """Add `delta` to the user count of every role currently linked to `user_id`."""
+    stmt = insert(RoleUserStat).from_select(
+        ["role_id", "count"],
+        select(UserRole.role_id, literal(delta)).where(UserRole.user_id == user_id),
+    )
+    db.execute(stmt.on_conflict_do_update(index_elements=[RoleUserStat.role_id], set_={"count": RoleUserStat.count + stmt.excluded.count}))
+
+def record_user_created(db: Session):
+    _add_user_stat(db, ACTIVE, 1)
+    # Same expression as User.created_at's server default, evaluated in the same transaction
+    _add_signups(db, func.current_date(), 1)
+
+def record_user_soft_deleted(db: Session, user_id: int):
+    _add_user_stat(db, ACTIVE, -1)
+    _add_user_stat(db, SOFT_DELETED, 1)
+    _add_role_users(db, user_id, -1)
+
+def record_user_restored(db: Session, user_id: int):
+    _add_user_stat(db, ACTIVE, 1)
+    _add_user_stat(db, SOFT_DELETED, -1)
+    _add_role_users(db, user_id, 1)
+
+def record_user_hard_deleted(db: Session, user: User | UserArchive):
+    # Archived users were soft deleted before being moved, so they take the second branch
+    if user.deleted_at is None:
+        _add_user_stat(db, ACTIVE, -1)
+        _add_role_users(db, user.id, -1)
+    else:
+        _add_user_stat(db, SOFT_DELETED, -1)
+    _add_signups(db, user.created_at, -1)
+
+def record_role_assigned(db: Session, role_id: int):
+    stmt = insert(RoleUserStat).values(role_id=role_id, count=1)
+    db.execute(stmt.on_conflict_do_update(index_elements=[RoleUserStat.role_id], set_={"count": RoleUserStat.count + 1}))
+
+def record_role_deleted(db: Session, role_id: int):
+    db.execute(delete(RoleUserStat).where(RoleUserStat.role_id == role_id))
+
+def refresh_role_users(db: Session, role_id: int):
+    """Recount one role, used when its links come back from the archive."""
+    count = db.execute(
+        select(func.count()).select_from(UserRole).join(User, User.id == UserRole.user_id)
+        .where(UserRole.role_id == role_id, User.deleted_at.is_(None))
+    ).scalar()
+    stmt = insert(RoleUserStat).values(role_id=role_id, count=count)
+    db.execute(stmt.on_conflict_do_update(index_elements=[RoleUserStat.role_id], set_={"count": stmt.excluded.count}))
+
+def rebuild_stats(db: Session):
+    """Recompute every summary table from the user, user_archive and user_role tables."""
+    # Serialise concurrent rebuilds (e.g. several workers starting at once)
+    db.execute(text("SELECT pg_advisory_xact_lock(hashtext('user_stat_rebuild'))"))
+    db.execute(delete(UserStat))
+    db.execute(delete(UserSignupStat))
+    db.execute(delete(RoleUserStat))
+
+    active = db.query(func.count(User.id)).filter(User.deleted_at.is_(None)).scalar()
+    soft_deleted = db.query(func.count(User.id)).filter(User.deleted_at.isnot(None)).scalar()
+    soft_deleted += db.query(func.count(UserArchive.id)).scalar()
+    db.add_all([UserStat(name=ACTIVE, value=active), UserStat(name=SOFT_DELETED, value=soft_deleted)])
+
+    created = union_all(select(User.created_at.label("day")), select(UserArchive.created_at.label("day"))).subquery()
+    db.execute(insert(UserSignupStat).from_select(
+        ["day", "count"],
+        select(created.c.day, func.count()).where(created.c.day.isnot(None)).group_by(created.c.day),
+    ))
+    db.execute(insert(RoleUserStat).from_select(
+        ["role_id", "count"],
+        select(UserRole.role_id, func.count()).join(User, User.id == UserRole.user_id)
+        .where(User.deleted_at.is_(None)).group_by(UserRole.role_id),
+    ))
+    db.commit()
+    logger.info(f"Rebuilt user stats: {active} active, {soft_deleted} soft-deleted")
+
+def ensure_stats(db: Session):
+    """Backfill the summary tables the first time the application starts against existing data."""
+    if db.query(UserStat).first() is None:
+        rebuild_stats(db)
+
+def get_user_totals(db: Session) -> dict:
+    values = dict(db.query(UserStat.name, UserStat.value).all())
+    active = values.get(ACTIVE, 0)
+    soft_deleted = values.get(SOFT_DELETED, 0)
+    total = active + soft_deleted
+    return {
+        "total": total,
+        "active": active,
+        "soft_deleted": soft_deleted,
+        "soft_deleted_ratio": soft_deleted / total if total else 0.0,
+    }
+
+def get_users_per_role(db: Session) -> list[dict]:
+    rows = (
+        db.query(Role.id, Role.name, func.coalesce(RoleUserStat.count, 0))
+        # Roles that never had a user have no stat row yet
+        .outerjoin(RoleUserStat, RoleUserStat.role_id == Role.id)
+        .filter(Role.deleted_at.is_(None))
+        .order_by(Role.name)
+        .all()
+    )
+    return [{"role_id": role_id, "name": name, "users": count} for role_id, name, count in rows]
+
+def get_signups_per_day(db: Session, since: date | None = None, until: date | None = None) -> list[dict]:
+    query = db.query(UserSignupStat).filter(UserSignupStat.count > 0)
+    if since:
+        query = query.filter(UserSignupStat.day >= since)
+    if until:
+        query = query.filter(UserSignupStat.day <= until)
+    return [{"day": row.day, "count": row.count} for row in query.order_by(UserSignupStat.day).all()]
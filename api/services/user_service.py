@@ -1,15 +1,20 @@
-from sqlalchemy.orm import Session, joinedload
-from elasticsearch import Elasticsearch
-from api.models import User
+from sqlalchemy.orm import Session, joinedload, selectinload, load_only
+from api.models import User, UserArchive, UserRoleArchive
 from api.schemas.user import UserCreate, UserUpdate, UserResponse
+from api.schemas.role import RoleResponse
+from api.services.archive_service import restore_archived_user, delete_archived_links
+from api.services.stats_service import record_user_created, record_user_soft_deleted, record_user_restored, record_user_hard_deleted
 from sqlalchemy.sql import func
 import logging
 
 logger = logging.getLogger(__name__)
 
+USER_FIELDS = ("id", "name", "email", "is_default", "can_deleted", "created_at", "updated_at", "deleted_at")
+
 def store_user(db: Session, user: UserCreate) -> UserResponse:
     db_user = User(**user.dict())
     db.add(db_user)
+    record_user_created(db)
     db.commit()
     db.refresh(db_user)
     logger.info(f"Stored user {db_user.id}")
@@ -25,6 +30,80 @@ def get_user_by_id(db: Session, user_id: int) -> UserResponse:
         return None
     return UserResponse.from_orm(user)
 
+def get_users_by_ids(db: Session, user_ids: list[int]) -> list[UserResponse]:
+    users = (
+        db.query(User)
+        .options(selectinload(User.roles))
+        .filter(User.id.in_(user_ids), User.deleted_at.is_(None))
+        .all()
+    )
+    logger.info(f"Loaded {len(users)} of {len(user_ids)} requested users")
+    return [UserResponse.from_orm(user) for user in users]
+
+def parse_projection(fields: str | None, include: str | None) -> tuple[list[str], bool] | None:
+    """
+    Turn the `fields` and `include` query parameters into (columns, include_roles).
+    Returns None when neither is given, meaning the full UserResponse. Raises ValueError
+    for unknown names.
+    """
+    if fields is None and include is None:
+        return None
+    includes = [name.strip() for name in (include or "").split(",") if name.strip()]
+    unknown = [name for name in includes if name != "roles"]
+    if unknown:
+        raise ValueError(f"Unknown include: {', '.join(unknown)}. Allowed: roles")
+    if fields is None:
+        columns = list(USER_FIELDS)
+    else:
+        columns = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in columns if name not in USER_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(USER_FIELDS)}")
+        # id is always returned so clients can correlate rows
+        columns = ["id"] + [name for name in USER_FIELDS if name in columns and name != "id"]
+    return columns, "roles" in includes
+
+def projection_key(columns: list[str], include_roles: bool) -> str:
+    return ",".join(columns) + ("+roles" if include_roles else "")
+
+def _projected_query(db: Session, columns: list[str], roles_loading: str | None):
+    """Column-only query on User; `roles_loading` is None, "selectin" or "joined"."""
+    query = db.query(User).options(load_only(*[getattr(User, name) for name in columns]))
+    if roles_loading == "selectin":
+        query = query.options(selectinload(User.roles))
+    elif roles_loading == "joined":
+        query = query.options(joinedload(User.roles))
+    return query
+
+def _project(user: User, columns: list[str], include_roles: bool) -> dict:
+    data = {name: getattr(user, name) for name in columns}
+    if include_roles:
+        data["roles"] = [RoleResponse.from_orm(role).dict() for role in user.roles]
+    return data
+
+def get_all_users_projected(db: Session, columns: list[str], include_roles: bool) -> list[dict]:
+    # selectinload keeps one row per user instead of one per (user, role) pair
+    users = _projected_query(db, columns, "selectin" if include_roles else None).filter(User.deleted_at.is_(None)).all()
+    return [_project(user, columns, include_roles) for user in users]
+
+def get_user_by_id_projected(db: Session, user_id: int, columns: list[str], include_roles: bool) -> dict | None:
+    user = (
+        _projected_query(db, columns, "joined" if include_roles else None)
+        .filter(User.id == user_id, User.deleted_at.is_(None))
+        .first()
+    )
+    if not user:
+        return None
+    return _project(user, columns, include_roles)
+
+def get_users_by_ids_projected(db: Session, user_ids: list[int], columns: list[str], include_roles: bool) -> list[dict]:
+    users = (
+        _projected_query(db, columns, "selectin" if include_roles else None)
+        .filter(User.id.in_(user_ids), User.deleted_at.is_(None))
+        .all()
+    )
+    return [_project(user, columns, include_roles) for user in users]
+
 def update_user(db: Session, user_id: int, user: UserUpdate) -> UserResponse:
     db_user = db.query(User).filter(User.id == user_id, User.deleted_at == None).first()
     if not db_user:
@@ -46,34 +125,35 @@ def soft_deleted_user(db: Session, user_id: int) -> tuple[bool, str]:
         logger.warning(f"User {user_id} cannot be deleted (can_deleted=False)")
         return False, "User cannot be deleted"
     db_user.deleted_at = func.current_date()
+    record_user_soft_deleted(db, user_id)
     db.commit()
     logger.info(f"Soft deleted user {user_id}")
     return True, f"User {user_id} soft deleted"
 
 def restore_user(db: Session, user_id: int) -> bool:
     db_user = db.query(User).filter(User.id == user_id, User.deleted_at != None).first()
-    if not db_user:
+    if db_user:
+        db_user.deleted_at = None
+    elif not restore_archived_user(db, user_id):
         return False
-    db_user.deleted_at = None
+    record_user_restored(db, user_id)
     db.commit()
     logger.info(f"Restored user {user_id}")
     return True
 
-def hard_soft_deleted_user(db: Session, es: Elasticsearch, user_id: int) -> bool:
-    db_user = db.query(User).filter(User.id == user_id).first()
+def hard_soft_deleted_user(db: Session, user_id: int) -> bool:
+    db_user = db.query(User).filter(User.id == user_id).first() or db.get(UserArchive, user_id)
     if not db_user or not db_user.can_deleted:
         return False
+    record_user_hard_deleted(db, db_user)
+    delete_archived_links(db, UserRoleArchive.user_id == user_id)
     db.delete(db_user)
     db.commit()
-    try:
-        es.delete(index="users", id=str(user_id))
-        logger.info(f"Hard deleted user {user_id} from Elasticsearch")
-    except Exception as e:
-        logger.error(f"Failed to delete user {user_id} from Elasticsearch: {str(e)}")
     logger.info(f"Hard deleted user {user_id}")
     return True
 
 def get_all_soft_deleted_users(db: Session) -> list[UserResponse]:
     users = db.query(User).filter(User.deleted_at != None).all()
+    users += db.query(UserArchive).all()
     logger.info(f"Found {len(users)} soft-deleted users")
     return [UserResponse.from_orm(user) for user in users]
@@ -0,0 +1,72 @@
+import time
+from redis.asyncio import Redis
+import logging
+
+logger = logging.getLogger(__name__)
+
+USERS_SCOPE = "users"
+ROLES_SCOPE = "roles"
+
+def version_key(scope: str, entity_id: int | None = None) -> str:
+    if entity_id is None:
+        return f"version:{scope}"
+    return f"version:{scope}:{entity_id}"
+
+def _seed() -> int:
+    # Missing counters start from the current time in ms, so a flushed Redis
+    # never hands out a version a client may already hold for older data.
+    return time.time_ns() // 1_000_000
+
+async def bump_version(redis_client: Redis, scope: str, *entity_ids: int):
+    """
+    Bump the collection version of `scope` and the version of each given entity.
+    Failures are logged and swallowed so a Redis outage never fails a write.
+    """
+    keys = [version_key(scope)] + [version_key(scope, entity_id) for entity_id in entity_ids]
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        seed = _seed()
+        for key in keys:
+            pipe.set(key, seed, nx=True)
+            pipe.incr(key)
+        await pipe.execute()
+        logger.info(f"Bumped versions: {', '.join(keys)}")
+    except Exception as e:
+        logger.warning(f"Failed to bump versions {keys}: {str(e)}")
+
+async def get_versions(redis_client: Redis, keys: list[str]) -> list[int] | None:
+    """
+    Read the given version counters with a single MGET.
+    Returns None if Redis is unavailable, in which case no ETag should be emitted.
+    """
+    try:
+        values = await redis_client.mget(keys)
+        if any(value is None for value in values):
+            pipe = redis_client.pipeline(transaction=False)
+            seed = _seed()
+            for key, value in zip(keys, values):
+                if value is None:
+                    pipe.set(key, seed, nx=True)
+            pipe.mget(keys)
+            values = (await pipe.execute())[-1]
+        return [int(value) for value in values]
+    except Exception as e:
+        logger.warning(f"Failed to read versions {keys}: {str(e)}")
+        return None
+
+def make_etag(versions: list[int]) -> str:
+    return '"' + "-".join(str(v) for v in versions) + '"'
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Evaluate an If-None-Match header against an ETag (weak comparison, RFC 9110)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
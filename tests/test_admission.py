@@ -0,0 +1,31 @@
+import asyncio
+import pytest
+from api.middleware.admission import AdmissionGate, Rejected, classify_route, EXPENSIVE, DEFAULT
+
+def test_classify_route():
+    assert classify_route("GET", "/users") == EXPENSIVE
+    assert classify_route("GET", "/users/search") == EXPENSIVE
+    assert classify_route("GET", "/users/42") == DEFAULT
+    assert classify_route("POST", "/users") == DEFAULT
+    assert classify_route("GET", "/docs") is None
+    assert classify_route("GET", "/users/suggest") is None
+
+def test_gate_queues_then_rejects():
+    async def main():
+        gate = AdmissionGate("test", limit=1, queue_size=1, queue_timeout=0.1)
+        await gate.acquire()
+        waiter = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)
+        assert gate.waiting == 1
+        with pytest.raises(Rejected) as full:
+            await gate.acquire()
+        assert full.value.status_code == 503 and full.value.reason == "queue_full"
+        with pytest.raises(Rejected) as timeout:
+            await waiter
+        assert timeout.value.reason == "queue_timeout"
+        gate.release()
+        await gate.acquire()
+        assert gate.in_flight == 1
+        assert gate.rejected_total == {"queue_full": 1, "queue_timeout": 1, "rate_limited": 0}
+
+    asyncio.run(main())
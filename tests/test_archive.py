@@ -0,0 +1,62 @@
+import uuid
+from datetime import date, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from api.main import app
+from api.dependencies import SessionLocal, engine
+from api.models import Base, User, UserArchive
+from api.schemas.user import UserCreate
+from api.services.archive_service import archive_soft_deleted
+from api.services.user_service import store_user, soft_deleted_user
+
+# Runs against the CI Postgres, like test_user.py
+client = TestClient(app)
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+
+def _archive(db, user_id: int):
+    soft_deleted_user(db, user_id)
+    db.query(User).filter(User.id == user_id).update({User.deleted_at: date.today() - timedelta(days=30)})
+    db.commit()
+    archive_soft_deleted(db, retention_days=7, batch_size=100)
+    db.expire_all()
+    assert db.get(User, user_id) is None
+    assert db.get(UserArchive, user_id) is not None
+
+def _unique_email() -> str:
+    return f"archived-{uuid.uuid4().hex}@example.com"
+
+def test_archive_list_restore_and_hard_delete(db):
+    user_id = store_user(db, UserCreate(name="Archived User", email=_unique_email())).id
+    _archive(db, user_id)
+
+    response = client.get("/users/soft-deleted")
+    assert response.status_code == 200
+    assert user_id in [user["id"] for user in response.json()["data"]]
+
+    assert client.post(f"/users/restore/{user_id}").status_code == 200
+    db.expire_all()
+    assert db.get(User, user_id).deleted_at is None
+    assert db.get(UserArchive, user_id) is None
+
+    _archive(db, user_id)
+    assert client.delete(f"/users/{user_id}").status_code == 200
+    db.expire_all()
+    assert db.get(UserArchive, user_id) is None
+    assert client.post(f"/users/restore/{user_id}").status_code == 404
+
+def test_restore_conflicting_archived_user_returns_409(db):
+    email = _unique_email()
+    user_id = store_user(db, UserCreate(name="Archived User", email=email)).id
+    _archive(db, user_id)
+    store_user(db, UserCreate(name="Newer User", email=email))
+
+    response = client.post(f"/users/restore/{user_id}")
+    assert response.status_code == 409
+    db.expire_all()
+    assert db.get(UserArchive, user_id) is not None
@@ -0,0 +1,105 @@
+import asyncio
+import json
+from datetime import date
+import pytest
+from fastapi import HTTPException
+import api.routers.user as user_router
+from api.config import settings
+from api.routers.user import batch_get_users
+from api.schemas.user import UserResponse
+from api.services.redis_service import get_cached_users, cache_users
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def set(self, key, value, ex=None, nx=False):
+        self.commands.append(lambda: self.redis._set(key, value, nx))
+
+    def mget(self, keys):
+        self.commands.append(lambda: [self.redis.data.get(key) for key in keys])
+
+    async def execute(self):
+        return [command() for command in self.commands]
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def _set(self, key, value, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value)
+        return True
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+class StubLoader:
+    def __init__(self, known_ids):
+        self.known_ids = set(known_ids)
+        self.calls = []
+
+    def __call__(self, db, user_ids):
+        self.calls.append(list(user_ids))
+        return [_user(user_id) for user_id in user_ids if user_id in self.known_ids]
+
+def _user(user_id: int) -> UserResponse:
+    return UserResponse(id=user_id, name=f"User {user_id}", email=f"user{user_id}@example.com",
+                        is_default=False, can_deleted=True, created_at=date(2024, 1, 1), roles=[])
+
+@pytest.fixture
+def loader(monkeypatch):
+    stub = StubLoader(known_ids=[1, 2, 3])
+    monkeypatch.setattr(user_router, "get_users_by_ids", stub)
+    return stub
+
+def test_batch_get_keeps_order_and_marks_unknown_ids(loader):
+    response = asyncio.run(batch_get_users([3, 99, 1, 3], None, FakeRedis()))
+    assert [user.id if user else None for user in response.data] == [3, None, 1, 3]
+    assert response.not_found == [99]
+    assert loader.calls == [[3, 99, 1]]  # duplicates are loaded once
+
+def test_batch_get_serves_second_call_from_cache(loader):
+    redis = FakeRedis()
+
+    async def main():
+        await batch_get_users([1, 2], None, redis)
+        return await batch_get_users([2, 1], None, redis)
+
+    response = asyncio.run(main())
+    assert [user.id for user in response.data] == [2, 1]
+    assert loader.calls == [[1, 2]]
+
+def test_batch_get_rejects_too_many_ids(loader):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(batch_get_users(list(range(settings.BATCH_GET_MAX_IDS + 1)), None, FakeRedis()))
+    assert error.value.status_code == 400
+    assert loader.calls == []
+
+def test_cache_entries_are_tagged_with_roles_and_user_versions():
+    redis = FakeRedis()
+    redis.data.update({"version:roles": "7", "version:users:1": "3", "version:users:2": "5"})
+
+    async def main():
+        _, generations = await get_cached_users(redis, [1, 2], "version:roles", ["version:users:1", "version:users:2"])
+        await cache_users(redis, [_user(1).dict(), _user(2).dict()], generations)
+        redis.data["version:users:2"] = "6"  # user 2 written after its entry was cached
+        return await get_cached_users(redis, [1, 2], "version:roles", ["version:users:1", "version:users:2"])
+
+    hits, generations = asyncio.run(main())
+    assert json.loads(redis.data["user:1"])["generation"] == "7:3"
+    assert list(hits) == [1]
+    assert generations == {1: "7:3", 2: "7:6"}
+
+def test_entries_are_misses_while_a_version_is_missing():
+    redis = FakeRedis()
+    redis.data["user:1"] = json.dumps({"generation": "None:None", "data": {"id": 1}})
+
+    hits, generations = asyncio.run(get_cached_users(redis, [1], "version:roles", ["version:users:1"]))
+    assert hits == {}
+    assert generations == {1: None}
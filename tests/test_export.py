@@ -0,0 +1,40 @@
+import gzip
+import queue
+import threading
+from datetime import date
+import pytest
+from api.services.export_service import CSV, NDJSON, _users_query, _gzip_chunks, _QueueWriter, _ExportCancelled
+
+def test_users_query_excludes_deleted_by_default():
+    sql, params = _users_query(CSV, None, include_deleted=False)
+    assert "WHERE u.deleted_at IS NULL" in sql
+    assert params == {}
+
+def test_users_query_include_deleted_and_updated_since():
+    since = date(2024, 1, 1)
+    sql, params = _users_query(NDJSON, since, include_deleted=True)
+    assert "deleted_at IS NULL" not in sql
+    assert "(u.updated_at >= %(since)s OR u.created_at >= %(since)s)" in sql
+    assert params == {"since": since}
+
+def test_users_query_role_format_depends_on_output():
+    csv_sql, _ = _users_query(CSV, None, include_deleted=False)
+    ndjson_sql, _ = _users_query(NDJSON, None, include_deleted=False)
+    assert "string_agg" in csv_sql
+    assert "array_agg" in ndjson_sql
+
+def test_gzip_chunks_round_trip():
+    chunks = [b"id,name\n", b"", b"1,Alice\n" * 1000, b"2,Bob\n"]
+    assert gzip.decompress(b"".join(_gzip_chunks(iter(chunks)))) == b"".join(chunks)
+
+def test_queue_writer_stops_once_cancelled():
+    chunks = queue.Queue(maxsize=1)
+    cancelled = threading.Event()
+    writer = _QueueWriter(chunks, cancelled)
+    writer.write(b"first")
+    assert chunks.get_nowait() == b"first"
+
+    writer.write(b"fills the queue")
+    cancelled.set()
+    with pytest.raises(_ExportCancelled):
+        writer.write(b"never delivered")
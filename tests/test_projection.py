@@ -0,0 +1,22 @@
+import pytest
+from api.services.user_service import parse_projection, projection_key, USER_FIELDS
+
+def test_no_projection_means_full_response():
+    assert parse_projection(None, None) is None
+
+def test_fields_are_canonicalised_and_keep_id():
+    columns, include_roles = parse_projection("email, name", None)
+    assert columns == ["id", "name", "email"]
+    assert include_roles is False
+    assert projection_key(columns, include_roles) == "id,name,email"
+
+def test_include_roles_without_fields_returns_all_columns():
+    columns, include_roles = parse_projection(None, "roles")
+    assert columns == list(USER_FIELDS)
+    assert include_roles is True
+
+def test_unknown_names_are_rejected():
+    with pytest.raises(ValueError):
+        parse_projection("id,password", None)
+    with pytest.raises(ValueError):
+        parse_projection(None, "permissions")
@@ -0,0 +1,38 @@
+import asyncio
+from api.services.redis_service import search_cache_suffix
+from api.services.side_effects import run_side_effects
+from api.routers.user import _unindex_user
+
+def test_search_cache_suffix_normalizes_query():
+    assert search_cache_suffix("  Alice   SMITH ") == search_cache_suffix("alice smith")
+
+def test_search_cache_suffix_depends_on_params():
+    assert search_cache_suffix("alice", projection=None) != search_cache_suffix("alice", projection="id,name")
+
+class FakeRedis:
+    def __init__(self):
+        self.generation = 0
+
+    async def incr(self, key):
+        self.generation += 1
+        return self.generation
+
+class SlowElasticsearch:
+    def __init__(self):
+        self.deleted = False
+
+    async def delete(self, **kwargs):
+        await asyncio.sleep(0.2)
+        self.deleted = True
+
+def test_generation_bumped_only_after_a_timed_out_write_finishes():
+    redis, es = FakeRedis(), SlowElasticsearch()
+
+    async def main():
+        await run_side_effects(timeout=0.05, index=_unindex_user(es, redis, 1))
+        before = redis.generation
+        await asyncio.sleep(0.3)
+        return before
+
+    assert asyncio.run(main()) == 0
+    assert es.deleted and redis.generation == 1
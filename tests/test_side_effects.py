@@ -0,0 +1,26 @@
+import asyncio
+from api.services.side_effects import run_side_effects
+
+def test_run_side_effects_runs_concurrently_and_swallows_failures():
+    calls = []
+
+    async def ok(name):
+        await asyncio.sleep(0.05)
+        calls.append(name)
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    async def slow():
+        await asyncio.sleep(1)
+        calls.append("slow")
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await run_side_effects(timeout=0.2, first=ok("first"), second=ok("second"), failing=fail(), slow=slow())
+        return loop.time() - started
+
+    elapsed = asyncio.run(main())
+    assert sorted(calls) == ["first", "second"]
+    assert elapsed < 0.5
@@ -0,0 +1,26 @@
+import asyncio
+from api.services.elasticsearch_service import suggest_users
+
+class FakeElasticsearch:
+    def __init__(self):
+        self.calls = 0
+
+    async def search(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return {"hits": {"hits": [{"_id": "1", "_source": {"name": "Alice", "email": "alice@example.com"}}]}}
+
+def test_identical_in_flight_prefixes_share_one_query():
+    es = FakeElasticsearch()
+
+    async def main():
+        return await asyncio.gather(suggest_users(es, "ali", 5), suggest_users(es, "ALI ", 5), suggest_users(es, "ali", 3))
+
+    first, second, third = asyncio.run(main())
+    assert first == second == third == [{"id": 1, "name": "Alice", "email": "alice@example.com"}]
+    assert es.calls == 2  # different limit is a different query
+
+def test_empty_prefix_skips_elasticsearch():
+    es = FakeElasticsearch()
+    assert asyncio.run(suggest_users(es, "  ", 5)) == []
+    assert es.calls == 0
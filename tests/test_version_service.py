@@ -0,0 +1,17 @@
+from api.services.version_service import version_key, make_etag, etag_matches
+
+def test_version_key():
+    assert version_key("users") == "version:users"
+    assert version_key("users", 7) == "version:users:7"
+
+def test_make_etag():
+    assert make_etag([3, 9]) == '"3-9"'
+
+def test_etag_matches():
+    etag = make_etag([3, 9])
+    assert etag_matches('"3-9"', etag)
+    assert etag_matches('W/"3-9"', etag)
+    assert etag_matches('"1-1", "3-9"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"3-8"', etag)
+    assert not etag_matches(None, etag)